@@ -47,6 +47,8 @@ from inform import (
     Info,
 )
 import collections.abc
+import functools
+import operator
 import re
 import unicodedata
 
@@ -54,6 +56,9 @@ import unicodedata
 # Utility functions {{{1
 # convert_line_terminators {{{2
 def convert_line_terminators(text):
+    if "\r" not in text:
+        # the common case; avoid copying the text twice
+        return text
     return text.replace("\r\n", "\n").replace("\r", "\n")
 
 
@@ -236,6 +241,29 @@ dict_item_regex = r"""
 """
 dict_item_recognizer = re.compile(dict_item_regex, re.VERBOSE)
 
+# maps the leading two characters of a stripped line to the kind of line for
+# those kinds that are identified by a tag alone
+line_tags = {
+    "-": "list item",
+    "- ": "list item",
+    ">": "string item",
+    "> ": "string item",
+    ":": "key item",
+    ": ": "key item",
+}
+
+# kinds of lines that hold no data
+ignored_kinds = frozenset(["blank", "comment"])
+
+# kinds of lines that hold data
+value_kinds = frozenset([
+    "list item", "string item", "key item", "dict item",
+    "inline list", "inline dict",
+])
+
+# kinds of lines that may be continued on subsequent lines
+multiline_kinds = frozenset(["key item", "string item"])
+
 
 # report {{{2
 def report(message, line, *args, colno=None, **kwargs):
@@ -311,19 +339,20 @@ class Lines:
         self.next_line = True
         while self.next_line:
             self.next_line = next(self.generator, None)
-            if self.next_line and self.next_line.kind not in ["blank", "comment"]:
+            if self.next_line and self.next_line.kind not in ignored_kinds:
                 return
 
     # Line class {{{3
     class Line(Info):
         def render(self, col=None):
-            result = [f"{self.lineno+1:>4} ❬{self.text}❭"]
+            text = self.text
+            result = f"{self.lineno+1:>4} ❬{text}❭"
             if col is not None:
-                l = len(self.text)
+                l = len(text)
                 if l < col:
                     col = l
-                result += ["      " + (col*" ") + "▲"]
-            return "\n".join(result)
+                result += "\n      " + (col*" ") + "▲"
+            return result
 
         def __str__(self):
             return self.text
@@ -353,15 +382,9 @@ class Lines:
                 kind = "comment"
                 value = line[1:].strip()
                 depth = None
-            elif stripped == "-" or stripped.startswith("- "):
-                kind = "list item"
+            elif stripped[:2] in line_tags:
+                kind = line_tags[stripped[:2]]
                 value = stripped[2:]
-            elif stripped == ">" or stripped.startswith("> "):
-                kind = "string item"
-                value = line[depth+2:]
-            elif stripped == ":" or stripped.startswith(": "):
-                kind = "key item"
-                value = line[depth+2:]
             elif stripped[0:1] in ["[", "{"] and self.support_inlines:
                 tag = stripped[0:1]
                 kind = "inline dict" if tag == "{" else "inline list"
@@ -388,7 +411,7 @@ class Lines:
                 value = value,
                 prev_line = prev_line,
             )
-            if kind.endswith(" item") or kind.startswith("inline "):
+            if kind in value_kinds:
                 # Create prev_line, which differs from last_line in that it
                 # is a copy of the line without a prev_line attribute of its
                 # own. This avoids keeping a chain of all previous lines.
@@ -409,11 +432,11 @@ class Lines:
                     last_line                 and
                     depth == last_line.depth  and
                     kind == last_line.kind    and
-                    kind in ["key item", "string item"]
+                    kind in multiline_kinds
                 ):
                     last_line.next_line = this_line
 
-            if kind in ['blank', 'comment']:
+            if kind in ignored_kinds:
                 self.last_comment_line = this_line
             else:
                 last_line = this_line
@@ -462,7 +485,7 @@ class Lines:
         # this is needed so type_of_next() and still_within_level() can easily
         # access the next line that contains actual data.
         self.next_line = next(self.generator, None)
-        while self.next_line and self.next_line.kind in ["blank", "comment"]:
+        while self.next_line and self.next_line.kind in ignored_kinds:
             self.next_line = next(self.generator, None)
 
         return line
@@ -516,9 +539,8 @@ class KeyPolicy:
             return None
         if isinstance(cls.on_dup, dict):
             dup_handler = cls.on_dup.pop(_OnDupCallback)
-            cls.on_dup.update(
-                dict(dictionary=dictionary, keys=keys)
-            )
+            cls.on_dup["dictionary"] = dictionary
+            cls.on_dup["keys"] = keys
             try:
                 key = dup_handler(key=key, state=cls.on_dup)
                 if key is None:
@@ -1320,7 +1342,8 @@ def loads(
     '''
 
     # code {{{3
-    lines = convert_line_terminators(content).split("\n")
+    # an empty document has no lines, as when it is read from an empty file
+    lines = convert_line_terminators(content).split("\n") if content else []
     loader = NestedTextLoader(
         lines, top, source, on_dup, keymap, normalize_key, dialect
     )
@@ -1461,6 +1484,55 @@ def grow(base, ext):
     return base + (ext,)
 
 
+# inline exclusions {{{2
+# characters that may not appear in strings rendered within inline lists and
+# dictionaries
+inline_list_exclusions = frozenset("\n\r[]{},")
+inline_dict_exclusions = frozenset("\n\r[]{}:,")
+
+
+# builtin_kinds {{{2
+# The dumper classifies every value it renders.  The general tests are
+# relatively slow, so the common built-in types are classified with a single
+# dictionary lookup and the general tests are only used for other types.
+builtin_kinds = {
+    dict: "mapping",
+    list: "collection",
+    tuple: "collection",
+    set: "collection",
+    frozenset: "collection",
+    str: "str",
+    type(None): "scalar",
+    bool: "scalar",
+    int: "scalar",
+    float: "scalar",
+}
+
+
+# _is_mapping {{{2
+def _is_mapping(obj):
+    kind = builtin_kinds.get(type(obj))
+    if kind:
+        return kind == "mapping"
+    return is_mapping(obj)
+
+
+# _is_collection {{{2
+def _is_collection(obj):
+    kind = builtin_kinds.get(type(obj))
+    if kind:
+        return kind == "mapping" or kind == "collection"
+    return is_collection(obj)
+
+
+# _is_str {{{2
+def _is_str(obj):
+    kind = builtin_kinds.get(type(obj))
+    if kind:
+        return kind == "str"
+    return is_str(obj)
+
+
 # NestedTextDumper class {{{2
 class NestedTextDumper:
     # constructor {{{3
@@ -1506,9 +1578,9 @@ class NestedTextDumper:
             self.is_a_str = lambda obj: isinstance(obj, str)
             self.is_a_scalar = lambda obj: False
         else:
-            self.is_a_dict = is_mapping
-            self.is_a_list = is_collection
-            self.is_a_str = is_str
+            self.is_a_dict = _is_mapping
+            self.is_a_list = _is_collection
+            self.is_a_str = _is_str
             self.is_a_scalar = lambda obj: obj is None or isinstance(obj, (bool, int, float))
             if is_str(default):
                 raise NotImplementedError(default)  # pragma: no cover
@@ -1544,7 +1616,7 @@ class NestedTextDumper:
             key = "\n".join(": "+l if l else ":" for l in key.split("\n"))
             if self.is_a_dict(value) or self.is_a_list(value):
                 return key + self.render_value(value, keys, values)
-            if is_str(value):
+            if _is_str(value):
                 # force use of multiline value with multiline keys
                 value = convert_line_terminators(value)
             else:
@@ -1564,8 +1636,9 @@ class NestedTextDumper:
 
     # render_inline_dict {{{3
     def render_inline_dict(self, obj, keys, values):
-        exclude = set("\n\r[]{}:,")
+        exclude = inline_dict_exclusions
         rendered = []
+        length = 0
         for k, v in obj.items():
             new_keys = grow(keys, k)
             new_values = grow(values, id(v))
@@ -1578,17 +1651,27 @@ class NestedTextDumper:
             rendered_key = self.render_inline_scalar(
                 mapped_key, exclude, new_keys, new_values
             )
-            rendered.append((mapped_key, key, f"{rendered_key}: {rendered_value}",))
+            item = f"{rendered_key}: {rendered_value}"
+            length += len(item) + 2
+            if length > self.width:
+                # the rendered dictionary cannot fit on one line, give up early
+                raise NotSuitableForInline from None
+            rendered.append((mapped_key, key, item))
         items = [v for mk, k, v in self.sort(rendered, keys)]
         return ''.join(["{", ", ".join(items), "}"])
 
     # render_inline_list {{{3
     def render_inline_list(self, obj, keys, values):
         rendered_values = []
+        length = 0
         for i, v in enumerate(obj):
             rendered_value = self.render_inline_value(
-                v, set("\n\r[]{},"), grow(keys, i), grow(values, id(v))
+                v, inline_list_exclusions, grow(keys, i), grow(values, id(v))
             )
+            length += len(rendered_value) + 2
+            if length > self.width:
+                # the rendered list cannot fit on one line, give up early
+                raise NotSuitableForInline from None
             rendered_values.append(rendered_value)
         if len(rendered_values) == 1 and not rendered_values[0]:
             return "[ ]"
@@ -1616,7 +1699,7 @@ class NestedTextDumper:
         else:
             raise NotSuitableForInline from None
 
-        if exclude & set(value):
+        if not exclude.isdisjoint(value):
             raise NotSuitableForInline from None
         if value.strip() != value:
             raise NotSuitableForInline from None
@@ -1628,7 +1711,7 @@ class NestedTextDumper:
         error = None
         content = ""
         obj = self.convert(obj, keys)
-        need_indented_block = is_collection(obj)
+        need_indented_block = _is_collection(obj)
 
         if self.is_a_dict(obj):
             self.check_for_cyclic_reference(obj, keys, values)
@@ -1744,7 +1827,7 @@ class NestedTextDumper:
             if new_key is None:
                 return key
             return new_key
-        elif is_mapping(mapper):
+        elif _is_mapping(mapper):
             try:
                 loc = mapper.get(keys)
                 if loc:
@@ -2212,6 +2295,11 @@ def dump(obj, dest, **kwargs):
 # NestedText Utilities {{{1
 # Extras that are useful when using NestedText.
 
+# constants {{{2
+# valid values for the strict argument of get_keys()
+strict_options = frozenset([True, False, "missing", "error", "all", "found"])
+strict_options_that_raise = frozenset([True, "error"])
+
 # get_value_from_keys {{{2
 def get_value_from_keys(data, keys):
     # description {{{3
@@ -2252,9 +2340,7 @@ def get_value_from_keys(data, keys):
     '''
 
     # code {{{3
-    for key in keys:
-        data = data[key]
-    return data
+    return get_value(data, keys)
 
 
 # get_lines_from_keys {{{2
@@ -2408,15 +2494,18 @@ def get_original_keys(keys, keymap, strict=False):
     '''
 
     # code {{{3
+    if type(keys) is not tuple:
+        keys = tuple(keys)
+
     original_keys = ()
-    for i in range(len(keys)):
+    for i, key in enumerate(keys):
         try:
-            loc = keymap[tuple(keys[:i+1])]
-            original_keys += loc._get_original_key(keys[i], strict),
+            loc = keymap[keys[:i+1]]
+            original_keys += loc._get_original_key(key, strict),
         except (KeyError, IndexError):
             if strict:
                 raise
-            original_keys += keys[i],
+            original_keys += key,
     return original_keys
 
 
@@ -2486,7 +2575,7 @@ def join_keys(keys, sep=", ", keymap=None, strict=False):
     # code {{{3
     if keymap:
         keys = get_original_keys(keys, keymap, strict=strict)
-    return sep.join(str(k) for k in keys)
+    return sep.join(map(str, keys))
 
 
 # get_keys {{{2
@@ -2583,24 +2672,34 @@ def get_keys(keys, keymap, *, original=True, strict=True, sep=None):
     '''
 
     # code {{{3
-    assert strict in [True, False, "missing", "error", "all", "found"], strict
+    assert strict in strict_options, strict
     if type(keys) is not tuple:
         keys = tuple(keys)
-
-    to_return = ()
-    for i in range(len(keys)):
-        try:
-            loc = keymap[tuple(keys[:i+1])]
-            key = loc._get_original_key(keys[i], strict) if original else keys[i]
-            if strict != "missing":
-                to_return += key,
-        except (KeyError, IndexError):
-            if strict in [True, "error"]:
-                raise
-            if strict != "found":
-                to_return += keys[i],
+    raise_if_missing = strict in strict_options_that_raise
+    include_found = strict != "missing"
+    include_missing = strict != "found"
+
+    to_return = []
+    for i, key in enumerate(keys):
+        prefix = keys[:i+1]
+        loc = keymap.get(prefix)
+        if loc is None:
+            # the keymap holds every prefix of the keys it contains, so once a
+            # prefix is missing all longer prefixes are missing as well
+            if raise_if_missing:
+                raise KeyError(prefix)
+            if include_missing:
+                to_return.extend(keys[i:])
+            break
+        if include_found:
+            to_return.append(
+                loc._get_original_key(key, strict) if original else key
+            )
+    to_return = tuple(to_return)
     if sep:
-        return sep.join(str(k) for k in to_return)
+        if all(type(k) is str for k in to_return):
+            return sep.join(to_return)
+        return sep.join(map(str, to_return))
     return to_return
 
 
@@ -2634,15 +2733,13 @@ def get_value(data, keys):
 
             >>> data = nt.loads(contents, "dict")
 
-            >>> get_value_from_keys(data, ("names", "given"))
+            >>> get_value(data, ("names", "given"))
             'Fumiko'
 
     '''
 
     # code {{{3
-    for key in keys:
-        data = data[key]
-    return data
+    return functools.reduce(operator.getitem, keys, data)
 
 
 # get_line_numbers {{{2
@@ -2725,13 +2822,16 @@ def get_line_numbers(keys, keymap, kind="value", *, strict=True, sep=None):
     '''
 
     # code {{{3
-    loc = get_location(keys, keymap)
+    if type(keys) is not tuple:
+        keys = tuple(keys)
+
+    loc = keymap.get(keys)
     if not loc:
         if strict:
             raise KeyError(keys)
-        else:
-            found = get_keys(keys, keymap, original=False, strict="found")
-            loc = keymap[found]
+        loc, depth = _walk_prefix(keys, keymap)
+        if not loc:
+            raise KeyError(keys[:depth])
     return loc.get_line_numbers(kind, sep)
 
 
@@ -2754,9 +2854,19 @@ def get_location(keys, keymap):
     if type(keys) is not tuple:
         keys = tuple(keys)
 
-    try:
-        return keymap[keys]
-    except KeyError:
-        return None
+    return keymap.get(keys)
+
+
+# _walk_prefix {{{2
+# returns the location of the longest prefix of keys found in keymap along with
+# the length of that prefix, keys must be a tuple
+def _walk_prefix(keys, keymap):
+    loc = keymap.get(())
+    for depth in range(1, len(keys) + 1):
+        next_loc = keymap.get(keys[:depth])
+        if not next_loc:
+            return loc, depth - 1
+        loc = next_loc
+    return loc, len(keys)
 
 # vim: set sw=4 sts=4 tw=80 fo=croqj foldmethod=marker et spell:
@@ -3,19 +3,20 @@
 # Imports {{{1
 import pytest
 import nestedtext as nt
-import arrow
 from pathlib import Path
-from functools import wraps
+from functools import lru_cache, wraps
 from io import StringIO
-from inform import Error, Info, render, indent, join, dedent
-from quantiphy import Quantity
+from inform import Error, Info, dedent
+import re
 import subprocess
-import json
 
 test_api = Path(__file__).parent / 'official_tests' / 'api'
 import sys; sys.path.append(str(test_api))
 import nestedtext_official_tests as official
 
+# the official test cases are used by several parametrizations, read them once
+official_cases = official.load_test_cases()
+
 # Parametrization {{{1
 
 parametrize = pytest.mark.parametrize
@@ -64,7 +65,8 @@ def parametrize_load_api(f):
     @param
     @write_file('load_str.nt')
     def load_str(p):
-        return lambda: nt.load(str(p), top='any'), str(p)
+        path = str(p)
+        return lambda: nt.load(path, top='any'), path
 
     @param
     @write_file('load_path.nt')
@@ -99,6 +101,17 @@ def parametrize_load_api(f):
 
     return parametrize(args, params)(f)
 
+# read_case_file {{{2
+@lru_cache(maxsize=None)
+def read_case_file(path):
+    """
+    Return the contents of a file from the official test suite.
+
+    Each case is run once for every variant of the load or dump API, so the
+    files are cached rather than read again for every variant.
+    """
+    return path.read_text()
+
 # parametrize_load_success_cases {{{2
 def parametrize_load_success_cases(f):
     """
@@ -112,7 +125,7 @@ def parametrize_load_success_cases(f):
     - ``data_out``: The data structure that should result from loading the 
       above file.
     """
-    cases = official.load_test_cases()
+    cases = official_cases
     args = 'path_in', 'data_out'
     params = []
     marks = {}
@@ -142,7 +155,7 @@ def parametrize_load_error_cases(f):
     - ``colno``: The column number where the error occurs (0-indexed).
     - ``message``: The error message that should be produced.
     """
-    cases = official.load_test_cases()
+    cases = official_cases
     args = 'path_in', 'lineno', 'colno', 'message'
     params = []
     marks = {}
@@ -235,7 +248,7 @@ def parametrize_dump_success_cases(f):
     - ``path_out``: The path to a file containing the NestedText that 
       should result from dumping the above data structure.
     """
-    cases = official.load_test_cases()
+    cases = official_cases
     args = 'data_in', 'path_out'
     params = []
     marks = {
@@ -266,7 +279,7 @@ def parametrize_dump_error_cases(f):
     - ``culprit``: The specific object responsible for the error.
     - ``message``: The error message that should be produced.
     """
-    cases = official.load_test_cases()
+    cases = official_cases
     args = 'data_in', 'culprit', 'message'
     params = []
     marks = {}
@@ -326,7 +339,7 @@ def parametrize_via_nt(relpath):
 @parametrize_load_api
 @parametrize_load_success_cases
 def test_load_success_cases(load_factory, path_in, data_out, tmp_path):
-    content = path_in.read_text()
+    content = read_case_file(path_in)
     load, _ = load_factory(content, tmp_path)
     assert load() == data_out
 
@@ -334,7 +347,7 @@ def test_load_success_cases(load_factory, path_in, data_out, tmp_path):
 @parametrize_load_api
 @parametrize_load_error_cases
 def test_load_error_cases(load_factory, path_in, lineno, colno, message, tmp_path):
-    content = path_in.read_text()
+    content = read_case_file(path_in)
     load, source = load_factory(content, tmp_path)
     lines = content.splitlines()
     line = lines[lineno]
@@ -360,11 +373,21 @@ def test_load_error_cases(load_factory, path_in, lineno, colno, message, tmp_pat
         assert culprit[1] == lineno+1
     else:
         assert culprit[0] == lineno+1
-    assert message == e.get_message()
-    assert e.line == line
-    assert e.source == source
-    assert e.lineno == lineno
-    assert e.colno == colno
+    result = dict(
+        message = e.get_message(),
+        line = e.line,
+        source = e.source,
+        lineno = e.lineno,
+        colno = e.colno,
+    )
+    expected = dict(
+        message = message,
+        line = line,
+        source = source,
+        lineno = lineno,
+        colno = colno,
+    )
+    assert result == expected
     if e.prev_line:
         assert e.prev_line == prev_line
     else:
@@ -410,291 +433,209 @@ def test_load_api_errors():
 def test_load_nones(given, expected, kwargs):
     assert nt.loads(given, **kwargs) == expected
 
-# test_load_top {{{2
-def test_load_top():
-    content = ''
-    data = nt.loads(content, top='dict')
-    assert data == {}
-    data = nt.loads(content, top=dict)
-    assert data == {}
-    data = nt.loads(content, top='list')
-    assert data == []
-    data = nt.loads(content, top=list)
-    assert data == []
-    data = nt.loads(content, top='str')
-    assert data == ''
-    data = nt.loads(content, top=str)
-    assert data == ''
-    data = nt.loads(content, top='any')
-    assert data == None
-    data = nt.loads(content, top=any)
-    assert data == None
-
-    content = 'key1: value1\nkey2: value2'
-    expected = {'key1': 'value1', 'key2': 'value2'}
-    data = nt.loads(content, top='dict')
-    assert data == expected
-    data = nt.loads(content, top=dict)
-    assert data == expected
-    data = nt.loads(content, top='any')
-    assert data == expected
-    data = nt.loads(content, top=any)
-    assert data == expected
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='list')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=list)
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='str')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=str)
-
-    content = '{key1: value1, key2: value2}'
-    expected = {'key1': 'value1', 'key2': 'value2'}
-    data = nt.loads(content, top='dict')
-    assert data == expected
-    data = nt.loads(content, top=dict)
-    assert data == expected
-    data = nt.loads(content, top='any')
-    assert data == expected
-    data = nt.loads(content, top=any)
-    assert data == expected
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='list')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=list)
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='str')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=str)
-
-    content = '- value1\n- value2'
-    expected = ['value1', 'value2']
-    data = nt.loads(content, top='list')
-    assert data == expected
-    data = nt.loads(content, top=list)
-    assert data == expected
-    data = nt.loads(content, top='any')
-    assert data == expected
-    data = nt.loads(content, top=any)
-    assert data == expected
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='dict')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=dict)
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='str')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=str)
-
-    content = '[value1, value2]'
-    expected = ['value1', 'value2']
-    data = nt.loads(content, top='list')
-    assert data == expected
-    data = nt.loads(content, top=list)
-    assert data == expected
-    data = nt.loads(content, top='any')
-    assert data == expected
-    data = nt.loads(content, top=any)
-    assert data == expected
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='dict')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=dict)
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='str')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=str)
-
-    content = '> this is a test\n> this is only a test'
-    expected = 'this is a test\nthis is only a test'
-    data = nt.loads(content, top='str')
-    assert data == expected
-    data = nt.loads(content, top=str)
-    assert data == expected
-    data = nt.loads(content, top='any')
-    assert data == expected
-    data = nt.loads(content, top=any)
-    assert data == expected
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='dict')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=dict)
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top='list')
-    with pytest.raises(nt.NestedTextError):
-        data = nt.loads(content, top=list)
-
-# test_load_top_str {{{3
-def test_load_top_str():
-    data = nt.loads('> hello', 'str')
-    assert data == 'hello'
-
-    data = nt.loads('', top='str')
-    assert data == ''
-
-    with pytest.raises(nt.NestedTextError) as e:
-        nt.loads('- hello', 'str')
-    assert e.value.get_message() == 'content must start with greater-than sign (>).'
-
-# test_load_top_list {{{3
-def test_load_top_list():
-    data = nt.loads('- hello', 'list')
-    assert data == ['hello']
-
-    data = nt.loads('', top='list')
-    assert data == []
+# expected error messages {{{2
+str_top_error = 'content must start with greater-than sign (>).'
+list_top_error = 'content must start with dash (-) or bracket ([).'
+dict_top_error = 'content must start with key or brace ({).'
+duplicate_key_error = 'duplicate key: key.'
 
-    with pytest.raises(nt.NestedTextError) as e:
-        nt.loads('> hello', 'list')
-    assert e.value.get_message() == 'content must start with dash (-) or bracket ([).'
-
-# test_load_top_dict {{{3
-def test_load_top_dict():
-    data = nt.loads('key: hello', 'dict')
-    assert data == {'key': 'hello'}
-
-    data = nt.loads('', top='dict')
-    assert data == {}
-
-    with pytest.raises(nt.NestedTextError) as e:
-        nt.loads('> hello', 'dict')
-    assert e.value.get_message() == 'content must start with key or brace ({).'
-
-# test_load_top_any {{{3
-def test_load_top_any():
-    data = nt.loads('> hello', 'any')
-    assert data == 'hello'
-
-    data = nt.loads('- hello', 'any')
-    assert data == ['hello']
-
-    data = nt.loads('key: hello', 'any')
-    assert data == {'key': 'hello'}
-
-    data = nt.loads('', 'any')
-    assert data == None
-
-
-# test_load_top_default {{{3
-def test_load_top_default():
-    data = nt.loads('key: hello')
-    assert data == {'key': 'hello'}
-
-    data = nt.loads('')
-    assert data == {}
-
-    with pytest.raises(nt.NestedTextError) as e:
-        nt.loads('> hello')
-    assert e.value.get_message() == 'content must start with key or brace ({).'
-
-# test_load_duplicates {{{2
-def test_load_duplicates():
-    def de_dup(key, state):
-        if key not in state:
-            state[key] = 1
-        state[key] += 1
-        return f"{key} — #{state[key]}"
-
-    def ignore_dup(key, state):
-        return None
-
-    def replace_dup(key, state):
-        return key
-
-    def dup_is_error(key, state):
-        raise KeyError(key)
-
-    regular_content = 'key: hello\nkey: goodbye'
-    inline_content = '{key: hello, key: goodbye}'
-
-    for content in [regular_content, inline_content]:
-        data = nt.loads(content, on_dup='ignore')
-        assert data == {'key': 'hello'}, content
-
-        data = nt.loads(content, on_dup=ignore_dup)
-        assert data == {'key': 'hello'}, content
-
-        data = nt.loads(content, on_dup='replace')
-        assert data == {'key': 'goodbye'}, content
-
-        data = nt.loads(content, on_dup=replace_dup)
-        assert data == {'key': 'goodbye'}, content
-
-        data = nt.loads(content, on_dup=de_dup)
-        assert data == {'key': 'hello', 'key — #2': 'goodbye'}, content
+# test_load_top {{{2
+@parametrize(
+    'content, top, expected', [
+        ( '',                                         'dict',  {}                                     ),
+        ( '',                                         dict,    {}                                     ),
+        ( '',                                         'list',  []                                     ),
+        ( '',                                         list,    []                                     ),
+        ( '',                                         'str',   ''                                     ),
+        ( '',                                         str,     ''                                     ),
+        ( '',                                         'any',   None                                   ),
+        ( '',                                         any,     None                                   ),
+        ( 'key1: value1\nkey2: value2',               'dict',  {'key1': 'value1', 'key2': 'value2'}   ),
+        ( 'key1: value1\nkey2: value2',               dict,    {'key1': 'value1', 'key2': 'value2'}   ),
+        ( 'key1: value1\nkey2: value2',               'any',   {'key1': 'value1', 'key2': 'value2'}   ),
+        ( 'key1: value1\nkey2: value2',               any,     {'key1': 'value1', 'key2': 'value2'}   ),
+        ( 'key1: value1\nkey2: value2',               'list',  nt.NestedTextError                     ),
+        ( 'key1: value1\nkey2: value2',               list,    nt.NestedTextError                     ),
+        ( 'key1: value1\nkey2: value2',               'str',   nt.NestedTextError                     ),
+        ( 'key1: value1\nkey2: value2',               str,     nt.NestedTextError                     ),
+        ( '{key1: value1, key2: value2}',             'dict',  {'key1': 'value1', 'key2': 'value2'}   ),
+        ( '{key1: value1, key2: value2}',             dict,    {'key1': 'value1', 'key2': 'value2'}   ),
+        ( '{key1: value1, key2: value2}',             'any',   {'key1': 'value1', 'key2': 'value2'}   ),
+        ( '{key1: value1, key2: value2}',             any,     {'key1': 'value1', 'key2': 'value2'}   ),
+        ( '{key1: value1, key2: value2}',             'list',  nt.NestedTextError                     ),
+        ( '{key1: value1, key2: value2}',             list,    nt.NestedTextError                     ),
+        ( '{key1: value1, key2: value2}',             'str',   nt.NestedTextError                     ),
+        ( '{key1: value1, key2: value2}',             str,     nt.NestedTextError                     ),
+        ( '- value1\n- value2',                       'list',  ['value1', 'value2']                   ),
+        ( '- value1\n- value2',                       list,    ['value1', 'value2']                   ),
+        ( '- value1\n- value2',                       'any',   ['value1', 'value2']                   ),
+        ( '- value1\n- value2',                       any,     ['value1', 'value2']                   ),
+        ( '- value1\n- value2',                       'dict',  nt.NestedTextError                     ),
+        ( '- value1\n- value2',                       dict,    nt.NestedTextError                     ),
+        ( '- value1\n- value2',                       'str',   nt.NestedTextError                     ),
+        ( '- value1\n- value2',                       str,     nt.NestedTextError                     ),
+        ( '[value1, value2]',                         'list',  ['value1', 'value2']                   ),
+        ( '[value1, value2]',                         list,    ['value1', 'value2']                   ),
+        ( '[value1, value2]',                         'any',   ['value1', 'value2']                   ),
+        ( '[value1, value2]',                         any,     ['value1', 'value2']                   ),
+        ( '[value1, value2]',                         'dict',  nt.NestedTextError                     ),
+        ( '[value1, value2]',                         dict,    nt.NestedTextError                     ),
+        ( '[value1, value2]',                         'str',   nt.NestedTextError                     ),
+        ( '[value1, value2]',                         str,     nt.NestedTextError                     ),
+        ( '> this is a test\n> this is only a test',  'str',   'this is a test\nthis is only a test'  ),
+        ( '> this is a test\n> this is only a test',  str,     'this is a test\nthis is only a test'  ),
+        ( '> this is a test\n> this is only a test',  'any',   'this is a test\nthis is only a test'  ),
+        ( '> this is a test\n> this is only a test',  any,     'this is a test\nthis is only a test'  ),
+        ( '> this is a test\n> this is only a test',  'dict',  nt.NestedTextError                     ),
+        ( '> this is a test\n> this is only a test',  dict,    nt.NestedTextError                     ),
+        ( '> this is a test\n> this is only a test',  'list',  nt.NestedTextError                     ),
+        ( '> this is a test\n> this is only a test',  list,    nt.NestedTextError                     ),
+    ]
+)
+def test_load_top(content, top, expected):
+    if expected is nt.NestedTextError:
+        with pytest.raises(nt.NestedTextError):
+            nt.loads(content, top=top)
+    else:
+        assert nt.loads(content, top=top) == expected
 
+# test_load_top_arg {{{3
+# top is passed as a positional argument, or not at all if it is None
+@parametrize(
+    'content, top, expected, message', [
+        ( '> hello',     'str',   'hello',             None            ),
+        ( '',            'str',   '',                  None            ),
+        ( '- hello',     'str',   nt.NestedTextError,  str_top_error   ),
+        ( '- hello',     'list',  ['hello'],           None            ),
+        ( '',            'list',  [],                  None            ),
+        ( '> hello',     'list',  nt.NestedTextError,  list_top_error  ),
+        ( 'key: hello',  'dict',  {'key': 'hello'},    None            ),
+        ( '',            'dict',  {},                  None            ),
+        ( '> hello',     'dict',  nt.NestedTextError,  dict_top_error  ),
+        ( '> hello',     'any',   'hello',             None            ),
+        ( '- hello',     'any',   ['hello'],           None            ),
+        ( 'key: hello',  'any',   {'key': 'hello'},    None            ),
+        ( '',            'any',   None,                None            ),
+        ( 'key: hello',  None,    {'key': 'hello'},    None            ),
+        ( '',            None,    {},                  None            ),
+        ( '> hello',     None,    nt.NestedTextError,  dict_top_error  ),
+    ]
+)
+def test_load_top_arg(content, top, expected, message):
+    args = [] if top is None else [top]
+    if expected is nt.NestedTextError:
         with pytest.raises(nt.NestedTextError) as e:
-            nt.loads(content)
-        assert e.value.get_message() == 'duplicate key: key.', content
-        assert e.value.source == None, content
+            nt.loads(content, *args)
+        assert e.value.get_message() == message
+    else:
+        assert nt.loads(content, *args) == expected
 
-        with pytest.raises(nt.NestedTextError) as e:
-            nt.loads(content, on_dup='error')
-        assert e.value.get_message() == 'duplicate key: key.', content
-        assert e.value.source == None, content
+# test_load_duplicates {{{2
+# on_dup handlers {{{3
+def de_dup(key, state):
+    if key not in state:
+        state[key] = 1
+    state[key] += 1
+    return f"{key} — #{state[key]}"
+
+def ignore_dup(key, state):
+    return None
+
+def replace_dup(key, state):
+    return key
+
+def dup_is_error(key, state):
+    raise KeyError(key)
+
+# test_load_duplicates {{{3
+duplicate_contents = parametrize(
+    'content', [
+        'key: hello\nkey: goodbye',
+        '{key: hello, key: goodbye}',
+    ],
+    ids = ['regular', 'inline'],
+)
 
-        with pytest.raises(nt.NestedTextError) as e:
-            nt.loads(content, on_dup=dup_is_error)
-        assert e.value.get_message() == 'duplicate key: key.', content
-        assert e.value.source == None, content
+@duplicate_contents
+@parametrize(
+    'on_dup, expected', [
+        ( 'ignore',     {'key': 'hello'}                             ),
+        ( ignore_dup,   {'key': 'hello'}                             ),
+        ( 'replace',    {'key': 'goodbye'}                           ),
+        ( replace_dup,  {'key': 'goodbye'}                           ),
+        ( de_dup,       {'key': 'hello', 'key — #2': 'goodbye'}      ),
+    ]
+)
+def test_load_duplicates(content, on_dup, expected):
+    assert nt.loads(content, on_dup=on_dup) == expected
 
-        with pytest.raises(nt.NestedTextError) as e:
-            nt.loads(content, source='nantucket')
-        assert e.value.get_message() == 'duplicate key: key.', content
-        assert e.value.source == 'nantucket', content
+# test_load_duplicates_errors {{{3
+@duplicate_contents
+@parametrize(
+    'kwargs, source', [
+        ( dict(),                          None         ),
+        ( dict(on_dup='error'),            None         ),
+        ( dict(on_dup=dup_is_error),       None         ),
+        ( dict(source='nantucket'),        'nantucket'  ),
+    ]
+)
+def test_load_duplicates_errors(content, kwargs, source):
+    with pytest.raises(nt.NestedTextError) as e:
+        nt.loads(content, **kwargs)
+    assert e.value.get_message() == duplicate_key_error
+    assert e.value.source == source
 
 # test_load_inline {{{2
 @parametrize(
     'given, expected, kwargs', [
         (
             '- v',
-            dict(message = 'content must start with key or brace ({).'),
+            dict(message = dict_top_error),
             dict(top='dict'),
         ),
         (
             '> v',
-            dict(message = 'content must start with key or brace ({).'),
+            dict(message = dict_top_error),
             dict(top='dict'),
         ),
         (
             '[v]',
-            dict(message = 'content must start with key or brace ({).'),
+            dict(message = dict_top_error),
             dict(top='dict'),
         ),
         (
             'k: v',
-            dict(message = 'content must start with dash (-) or bracket ([).'),
+            dict(message = list_top_error),
             dict(top='list'),
         ),
         (
             '{k: v}',
-            dict(message = 'content must start with dash (-) or bracket ([).'),
+            dict(message = list_top_error),
             dict(top='list'),
         ),
         (
             '> v',
-            dict(message = 'content must start with dash (-) or bracket ([).'),
+            dict(message = list_top_error),
             dict(top='list'),
         ),
         (
             'k: v',
-            dict(message = 'content must start with greater-than sign (>).'),
+            dict(message = str_top_error),
             dict(top='str'),
         ),
         (
             '{k: v}',
-            dict(message = 'content must start with greater-than sign (>).'),
+            dict(message = str_top_error),
             dict(top='str'),
         ),
         (
             '- v',
-            dict(message = 'content must start with greater-than sign (>).'),
+            dict(message = str_top_error),
             dict(top='str'),
         ),
         (
             '[v]',
-            dict(message = 'content must start with greater-than sign (>).'),
+            dict(message = str_top_error),
             dict(top='str'),
         ),
         (
@@ -741,7 +682,12 @@ def test_load_inline_errors(given, expected, kwargs):
     assert result == expected, given
 
 # test_keymaps {{{2
-def test_keymaps():
+# the line numbers that prefix each line of the keymap test documents
+line_number_prefix = re.compile(r'^.{0,4}', re.M)
+
+# keymap_doc {{{3
+@pytest.fixture(scope="module")
+def keymap_doc():
     document_with_linenos = dedent("""
         0   # Contact information for our officers
         1
@@ -794,211 +740,301 @@ def test_keymaps():
     """).strip()
 
     # remove line numbers from NestedText document
-    doc_lines = [l[4:] for l in document_with_linenos.splitlines()]
-    document = '\n'.join(doc_lines)
-    print(document)
-
-
-    #   keys                                  key    value    lines
-    #                                         r  c    r  c    k       v
-    cases = """
-        president                           → 2  0    3  4    2  3    3  4
-        president name                      → 3  4    3  10   3  4    3  4
-        president address                   → 4  4    5  10   4  5    5  7
-        president phone                     → 7  4    8  8    7  8    8  9
-        president phone cell_phone          → 8  8    8  20   8  9    8  9
-        president phone work_phone          → 9  8    9  20   9  10   9  10
-        president phone home_phone          → 10 8    10 20   10 11   10 11
-        president email                     → 12 4    12 11   12 13   12 13
-        president kids                      → 13 4    14 8    13 14   14 15
-        president kids 0                    → 14 8    14 10   14 15   14 15
-        president kids 1                    → 15 8    15 10   15 16   15 16
-        vice_president                      → 17 0    18 4    17 18   18 19
-        vice_president name                 → 18 4    18 10   18 19   18 19
-        vice_president address              → 19 4    20 10   19 20   20 22
-        vice_president phone                → 22 4    23 8    22 23   23 24
-        vice_president phone cell_phone     → 23 9    23 21   23 24   23 24
-        vice_president phone home_phone     → 23 37   23 49   23 24   23 24
-        vice_president email                → 24 4    24 11   24 25   24 25
-        vice_president kids                 → 25 4    26 8    25 26   26 27
-        vice_president kids 0               → 26 9    26 9    26 27   26 27
-        vice_president kids 1               → 26 16   26 16   26 27   26 27
-        vice_president kids 2               → 26 22   26 22   26 27   26 27
-        treasurer                           → 28 0    29 4    28 29   29 30
-        treasurer 0                         → 29 4    30 8    29 30   30 31
-        treasurer 0 name                    → 30 8    30 14   30 31   30 31
-        treasurer 0 address                 → 31 8    32 14   31 32   32 34
-        treasurer 0 phone                   → 34 8    34 15   34 35   34 35
-        treasurer 0 email                   → 35 8    35 15   35 36   35 36
-        treasurer 0 additional_roles        → 36 8    37 12   36 37   37 38
-        treasurer 0 additional_roles 0      → 37 12   37 14   37 38   37 38
-        multiline↲↲key                      → 39 0    42 6    39 42   42 45
-    """.strip().splitlines()
-
-    def fix_key(key, normalize):
+    document = line_number_prefix.sub('', document_with_linenos)
+    doc_lines = document.splitlines()
+    return document, doc_lines
+
+# parse_keymap_cases {{{3
+def parse_keymap_cases(cases):
+    """
+    Converts a table of keymap test cases into a list of tuples.
+
+    Each tuple contains the original keys, the keys as normalized by
+    keymap_normalize_key(), and a tuple of the 8 expected values.  In the
+    table, spaces in keys are given as underscores and newlines as ↲.
+    """
+    def fix_key(key, original):
         key = key.replace('↲', '\n')
         try:
             return int(key)
-        except:
-            if normalize:
-                return key.replace('_', ' ')
-            else:
-                return key
+        except ValueError:
+            return key.replace('_', ' ') if original else key
 
-    def normalize_key(key, parent_keys):
-        return key.replace(' ', '_')
-
-    def check_result(keys, expected, addresses):
-        location = keymap[keys]
-
-        # separate expected into 8 expected values
-        key_lineno, key_colno, lineno, colno, \
-        key_first_line, key_last_line, value_first_line, value_last_line \
-            = tuple(int(n) for n in expected.split())
-
-        # check raw row and column numbers
-        assert location.as_tuple() == (lineno, colno), keys
-        assert location.as_tuple('value') == (lineno, colno), keys
-        assert location.as_tuple('key') == (key_lineno, key_colno), keys
-
-        # check rendered row and column numbers
-        assert location.line.render() == f'{lineno+1:>4} ❬{doc_lines[lineno]}❭'
-        rendered = f"{lineno+1:>4} ❬{doc_lines[lineno]}❭\n      {colno*' '}▲"
-        assert location.line.render(colno) == rendered
-        assert location.as_line() == rendered
-        assert location.as_line('value') == rendered
-        rendered = f"{key_lineno+1:>4} ❬{doc_lines[key_lineno]}❭\n      {key_colno*' '}▲"
-        assert location.as_line('key') == rendered
-        line = location.as_line(kind='value', offset=None)
-        margin = 6
-        offset = 5
-        shift = min(margin + offset + colno, len(line) - 1)
-        rendered = f"{lineno+1:>4} ❬{doc_lines[lineno]}❭\n{shift*' '}▲"
-        assert location.as_line(offset=offset) == rendered
-        rendered = f"{lineno+1:>4} ❬{doc_lines[lineno]}❭"
-        assert location.as_line(offset=None) == rendered
-        assert str(location.line) == doc_lines[lineno]
-        assert repr(location.line) == f'Line({lineno+1}: ❬{doc_lines[lineno]}❭)'
-        assert repr(location) == f"Location(lineno={lineno}, colno={colno}, key_lineno={key_lineno}, key_colno={key_colno})"
-
-        # check line numbers as tuples
-        assert nt.get_lines_from_keys(addresses, keys, keymap, kind='key') == (key_first_line, key_last_line), keys
-        assert nt.get_lines_from_keys(addresses, list(keys), keymap, kind='value') == (value_first_line, value_last_line), keys
-
-        # check line numbers as tuples
-        assert nt.get_line_numbers(keys, keymap, kind='key') == (key_first_line, key_last_line), keys
-        assert nt.get_line_numbers(list(keys), keymap, kind='value') == (value_first_line, value_last_line), keys
-
-        bad_keys = keys + ("does-not-exist",)
+    parsed = []
+    for case in cases.strip().splitlines():
+        given, expected = case.split('→')
+        given = given.split()
+        parsed.append((
+            tuple(fix_key(k, True) for k in given),
+            tuple(fix_key(k, False) for k in given),
+            tuple(int(n) for n in expected.split()),
+        ))
+    return parsed
+
+# keymap_cases {{{3
+#   keys                                  key    value    lines
+#                                         r  c    r  c    k       v
+keymap_cases = parse_keymap_cases("""
+    president                           → 2  0    3  4    2  3    3  4
+    president name                      → 3  4    3  10   3  4    3  4
+    president address                   → 4  4    5  10   4  5    5  7
+    president phone                     → 7  4    8  8    7  8    8  9
+    president phone cell_phone          → 8  8    8  20   8  9    8  9
+    president phone work_phone          → 9  8    9  20   9  10   9  10
+    president phone home_phone          → 10 8    10 20   10 11   10 11
+    president email                     → 12 4    12 11   12 13   12 13
+    president kids                      → 13 4    14 8    13 14   14 15
+    president kids 0                    → 14 8    14 10   14 15   14 15
+    president kids 1                    → 15 8    15 10   15 16   15 16
+    vice_president                      → 17 0    18 4    17 18   18 19
+    vice_president name                 → 18 4    18 10   18 19   18 19
+    vice_president address              → 19 4    20 10   19 20   20 22
+    vice_president phone                → 22 4    23 8    22 23   23 24
+    vice_president phone cell_phone     → 23 9    23 21   23 24   23 24
+    vice_president phone home_phone     → 23 37   23 49   23 24   23 24
+    vice_president email                → 24 4    24 11   24 25   24 25
+    vice_president kids                 → 25 4    26 8    25 26   26 27
+    vice_president kids 0               → 26 9    26 9    26 27   26 27
+    vice_president kids 1               → 26 16   26 16   26 27   26 27
+    vice_president kids 2               → 26 22   26 22   26 27   26 27
+    treasurer                           → 28 0    29 4    28 29   29 30
+    treasurer 0                         → 29 4    30 8    29 30   30 31
+    treasurer 0 name                    → 30 8    30 14   30 31   30 31
+    treasurer 0 address                 → 31 8    32 14   31 32   32 34
+    treasurer 0 phone                   → 34 8    34 15   34 35   34 35
+    treasurer 0 email                   → 35 8    35 15   35 36   35 36
+    treasurer 0 additional_roles        → 36 8    37 12   36 37   37 38
+    treasurer 0 additional_roles 0      → 37 12   37 14   37 38   37 38
+    multiline↲↲key                      → 39 0    42 6    39 42   42 45
+""")
+
+# render_doc_line {{{3
+def render_doc_line(doc_lines, lineno, colno=None):
+    """
+    Returns the expected output of Line.render() for a line of a document.
+    """
+    rendered = f"{lineno+1:>4} ❬{doc_lines[lineno]}❭"
+    if colno is None:
+        return rendered
+    return f"{rendered}\n      {colno*' '}▲"
+
+# check_keymap_result {{{3
+# expected output of repr() for Line and Location objects
+line_repr = "Line(%d: ❬%s❭)"
+location_repr = "Location(lineno=%d, colno=%d, key_lineno=%d, key_colno=%d)"
+
+def check_keymap_result(keys, expected, addresses, keymap, doc_lines):
+    location = keymap[keys]
+
+    # separate expected into 8 expected values
+    key_lineno, key_colno, lineno, colno, \
+    key_first_line, key_last_line, value_first_line, value_last_line \
+        = expected
+    key_line_nums = (key_first_line, key_last_line)
+    value_line_nums = (value_first_line, value_last_line)
+    if key_first_line+1 != key_last_line:
+        key_lines = f"{key_first_line+1}-{key_last_line}"
+    else:
+        key_lines = str(key_last_line)
+    if value_first_line+1 != value_last_line:
+        value_lines = f"{value_first_line+1}-{value_last_line}"
+    else:
+        value_lines = str(value_last_line)
+    line = render_doc_line(doc_lines, lineno)
+    rendered_value = render_doc_line(doc_lines, lineno, colno)
+    rendered_key = render_doc_line(doc_lines, key_lineno, key_colno)
+    margin = 6
+    offset = 5
+    shift = min(offset + colno, len(line) - margin - 1)
+    bad_keys = keys + ("does-not-exist",)
+
+    # gather the actual and expected results so they are compared all at once
+    checks = {
+        # raw row and column numbers
+        "as_tuple()": (location.as_tuple(), (lineno, colno)),
+        "as_tuple('value')": (location.as_tuple('value'), (lineno, colno)),
+        "as_tuple('key')": (location.as_tuple('key'), (key_lineno, key_colno)),
+
+        # rendered row and column numbers
+        "line.render()": (location.line.render(), line),
+        "line.render(colno)": (location.line.render(colno), rendered_value),
+        "as_line()": (location.as_line(), rendered_value),
+        "as_line('value')": (location.as_line('value'), rendered_value),
+        "as_line('key')": (location.as_line('key'), rendered_key),
+        "as_line(offset=offset)": (
+            location.as_line(offset=offset),
+            render_doc_line(doc_lines, lineno, shift)
+        ),
+        "as_line(offset=None)": (location.as_line(offset=None), line),
+        "str(line)": (str(location.line), doc_lines[lineno]),
+        "repr(line)": (
+            repr(location.line),
+            line_repr % (lineno+1, doc_lines[lineno])
+        ),
+        "repr(location)": (
+            repr(location),
+            location_repr % (lineno, colno, key_lineno, key_colno)
+        ),
 
-        with pytest.raises(KeyError) as exception:
-            nt.get_line_numbers(bad_keys, keymap, kind='value', strict=True)
-        assert exception.value.args[0] == bad_keys
+        # line numbers as tuples
+        "get_lines_from_keys(key)": (
+            nt.get_lines_from_keys(addresses, keys, keymap, kind='key'),
+            key_line_nums
+        ),
+        "get_lines_from_keys(value)": (
+            nt.get_lines_from_keys(addresses, list(keys), keymap, kind='value'),
+            value_line_nums
+        ),
+        "get_line_numbers(key)": (
+            nt.get_line_numbers(keys, keymap, kind='key'),
+            key_line_nums
+        ),
+        "get_line_numbers(value)": (
+            nt.get_line_numbers(list(keys), keymap, kind='value'),
+            value_line_nums
+        ),
+        "get_line_numbers(bad_keys)": (
+            nt.get_line_numbers(bad_keys, keymap, kind='value', strict=False),
+            value_line_nums
+        ),
 
-        assert nt.get_line_numbers(bad_keys, keymap, kind='value', strict=False) == (value_first_line, value_last_line), keys
+        # line numbers as strings
+        "get_lines_from_keys(key, sep)": (
+            nt.get_lines_from_keys(addresses, keys, keymap, kind='key', sep='-'),
+            key_lines
+        ),
+        "get_lines_from_keys(value, sep)": (
+            nt.get_lines_from_keys(addresses, keys, keymap, kind='value', sep='-'),
+            value_lines
+        ),
+        "get_line_numbers(key, sep)": (
+            nt.get_line_numbers(keys, keymap, kind='key', sep='-'),
+            key_lines
+        ),
+        "get_line_numbers(value, sep)": (
+            nt.get_line_numbers(keys, keymap, kind='value', sep='-'),
+            value_lines
+        ),
+    }
+    actual = {name: result for name, (result, _) in checks.items()}
+    expected = {name: result for name, (_, result) in checks.items()}
+    assert actual == expected, keys
 
-        # check line numbers as strings
-        if key_first_line+1 != key_last_line:
-            key_lines = f"{key_first_line+1}-{key_last_line}"
-        else:
-            key_lines = str(key_last_line)
-        assert nt.get_lines_from_keys(addresses, keys, keymap, kind='key', sep='-') == key_lines, keys
-        if value_first_line+1 != value_last_line:
-            value_lines = f"{value_first_line+1}-{value_last_line}"
-        else:
-            value_lines = str(value_last_line)
-        assert nt.get_lines_from_keys(addresses, keys, keymap, kind='value', sep='-') == value_lines, keys
+    with pytest.raises(KeyError) as exception:
+        nt.get_line_numbers(bad_keys, keymap, kind='value', strict=True)
+    assert exception.value.args[0] == bad_keys
 
-        # check line numbers as strings
-        if key_first_line+1 != key_last_line:
-            key_lines = f"{key_first_line+1}-{key_last_line}"
-        else:
-            key_lines = str(key_last_line)
-        assert nt.get_line_numbers(keys, keymap, kind='key', sep='-') == key_lines, keys
-        if value_first_line+1 != value_last_line:
-            value_lines = f"{value_first_line+1}-{value_last_line}"
-        else:
-            value_lines = str(value_last_line)
-        assert nt.get_line_numbers(keys, keymap, kind='value', sep='-') == value_lines, keys
+# keymap_normalize_key {{{3
+def keymap_normalize_key(key, parent_keys):
+    return key.replace(' ', '_')
 
-    # Without key normalization
+# parsed_keymap_doc {{{3
+@pytest.fixture(
+    scope="module", params=[None, keymap_normalize_key], ids=["raw", "normalized"]
+)
+def parsed_keymap_doc(request, keymap_doc):
+    # the keymap document loaded with and without key normalization
+    # the results are shared between tests and so must not be modified
+    document, doc_lines = keymap_doc
+    normalize_key = request.param
     keymap = {}
-    addresses = nt.loads(document, keymap=keymap)
-    for case in cases:
-        given, expected = case.split('→')
-        keys = tuple(fix_key(n, True) for n in given.split())
-        check_result(keys, expected, addresses)
-
-    ml_keys = ("multiline\n\nkey",)
-    loc = nt.get_location(ml_keys, keymap)
-    assert loc.as_line('key') == dedent("""
+    addresses = nt.loads(document, keymap=keymap, normalize_key=normalize_key)
+    return addresses, keymap, doc_lines, normalize_key
+
+# test_keymaps {{{3
+def test_keymaps(parsed_keymap_doc):
+    addresses, keymap, doc_lines, normalize_key = parsed_keymap_doc
+    for original_keys, normalized_keys, expected in keymap_cases:
+        keys = normalized_keys if normalize_key else original_keys
+        check_keymap_result(keys, expected, addresses, keymap, doc_lines)
+
+# test_keymaps_multiline_keys {{{3
+# expected results from Location.as_line() for the multiline keys
+multiline_key_lines = [
+    (("multiline\n\nkey",), 'key', 0, dedent("""
         ◊ 40 ❬: multiline❭
               ▲
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('key', offset=(1,0)) == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (("multiline\n\nkey",), 'key', (1,0), dedent("""
         ◊ 41 ❬:❭
               ▲
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('key', offset=(2,0)) == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (("multiline\n\nkey",), 'key', (2,0), dedent("""
         ◊ 42 ❬: key❭
               ▲
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('value') == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (("multiline\n\nkey",), 'value', 0, dedent("""
         ◊ 43 ❬    > it’s value❭
                     ▲
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('value', offset=(1,0)) == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (("multiline\n\nkey",), 'value', (1,0), dedent("""
         ◊ 44 ❬    >❭
                    ▲
-    """, bolm='◊', strip_nl="b")
+    """, bolm='◊', strip_nl="b")),
         # the above misplacement of the pointer is expected
-    assert loc.as_line('value', offset=(2,0)) == dedent("""
+    (("multiline\n\nkey",), 'value', (2,0), dedent("""
         ◊ 45 ❬    > it’s a long value❭
                     ▲
-    """, bolm='◊', strip_nl="b")
-    ml_keys = ("",)
-    loc = nt.get_location(ml_keys, keymap)
-    assert loc.as_line('key') == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (("",), 'key', 0, dedent("""
         ◊ 46 ❬:❭
               ▲
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('value') == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (("",), 'value', 0, dedent("""
         ◊ 47 ❬    >❭
                    ▲
-    """, bolm='◊', strip_nl="b")
-
-    # With key normalization
-    keymap = {}
-    addresses = nt.loads(document, keymap=keymap, normalize_key=normalize_key)
-    for case in cases:
-        given, expected = case.split('→')
-        keys = tuple(fix_key(n, False) for n in given.split())
-        check_result(keys, expected, addresses)
-
-    addresses = nt.loads(document, keymap=keymap, normalize_key=normalize_key)
-    keys = ("president", "address")
-    loc = nt.get_location(keys, keymap)
-    assert loc.as_line('value') == dedent("""
+    """, bolm='◊', strip_nl="b")),
+]
+
+def test_keymaps_multiline_keys(parsed_keymap_doc):
+    addresses, keymap, doc_lines, normalize_key = parsed_keymap_doc
+    for keys, kind, offset, expected in multiline_key_lines:
+        loc = nt.get_location(keys, keymap)
+        assert loc.as_line(kind, offset=offset) == expected, (keys, kind, offset)
+
+# test_keymaps_offsets {{{3
+# expected results from Location.as_line() for various offsets
+offset_lines = [
+    (0, dedent("""
         ◊  6 ❬        > 138 Almond Street❭
                         ▲
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('value', offset=None) == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (None, dedent("""
         ◊  6 ❬        > 138 Almond Street❭
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('value', offset=4) == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    (4, dedent("""
         ◊  6 ❬        > 138 Almond Street❭
                             ▲
-    """, bolm='◊', strip_nl="b")
-    assert loc.as_line('value', offset=(1,8)) == dedent("""
+    """, bolm='◊', strip_nl="b")),
+    ((1,8), dedent("""
         ◊  7 ❬        > Topeka, Kansas 20697❭
                                 ▲
-    """, bolm='◊', strip_nl="b")
+    """, bolm='◊', strip_nl="b")),
+]
+
+def test_keymaps_offsets(parsed_keymap_doc):
+    addresses, keymap, doc_lines, normalize_key = parsed_keymap_doc
+    keys = ("president", "address")
+    loc = nt.get_location(keys, keymap)
+    for offset, expected in offset_lines:
+        assert loc.as_line('value', offset=offset) == expected, offset
     with pytest.raises(IndexError) as exception:
         loc.as_line('value', offset=(2,8))
     assert exception.value.args == (2,)
 
 
 # test_keymaps_with_duplicates {{{2
+#   keys                                  key    value    lines
+#                                         r  c    r  c    k       v
+keymap_with_duplicates_cases = parse_keymap_cases("""
+    michael_jordan                      → 0  0    1  4    0  1    1  2
+    michael_jordan occupation           → 1  4    1  16   1  2    1  2
+    michael_jordan2                     → 3  0    4  4    3  4    4  5
+    michael_jordan2 occupation          → 4  4    4  16   4  5    4  5
+    michael_jordan3                     → 6  0    7  4    6  7    7  8
+    michael_jordan3 occupation          → 7  4    7  16   7  8    7  8
+""")
+
 def test_keymaps_with_duplicates():
 
     document_with_linenos = dedent("""
@@ -1013,33 +1049,8 @@ def test_keymaps_with_duplicates():
     """).strip()
 
     # remove line numbers from NestedText document
-    doc_lines = [l[4:] for l in document_with_linenos.splitlines()]
-    document = '\n'.join(doc_lines)
-    print(document)
-
-    #   keys                                  key    value    lines
-    #                                         r  c    r  c    k       v
-    cases = """
-        michael_jordan                      → 0  0    1  4    0  1    1  2
-        michael_jordan occupation           → 1  4    1  16   1  2    1  2
-        michael_jordan2                     → 3  0    4  4    3  4    4  5
-        michael_jordan2 occupation          → 4  4    4  16   4  5    4  5
-        michael_jordan3                     → 6  0    7  4    6  7    7  8
-        michael_jordan3 occupation          → 7  4    7  16   7  8    7  8
-    """.strip().splitlines()
-
-    def fix_key(key, normalize):
-        key = key.replace('↲', '\n')
-        try:
-            return int(key)
-        except:
-            if normalize:
-                return key.replace('_', ' ')
-            else:
-                return key
-
-    def normalize_key(key, parent_keys):
-        return key.replace(' ', '_')
+    document = line_number_prefix.sub('', document_with_linenos)
+    doc_lines = document.splitlines()
 
     def de_dup(key, state):
         if key not in state:
@@ -1047,155 +1058,143 @@ def test_keymaps_with_duplicates():
         state[key] += 1
         return f"{key}{state[key]}"
 
-    def check_result(keys, expected, addresses):
-        location = keymap[keys]
-
-        # separate expected into 8 expected values
-        key_lineno, key_colno, lineno, colno, \
-        key_first_line, key_last_line, value_first_line, value_last_line \
-            = tuple(int(n) for n in expected.split())
-
-        # check raw row and column numbers
-        assert location.as_tuple() == (lineno, colno), keys
-        assert location.as_tuple('value') == (lineno, colno), keys
-        assert location.as_tuple('key') == (key_lineno, key_colno), keys
-
-        # check rendered row and column numbers
-        assert location.line.render() == f'{lineno+1:>4} ❬{doc_lines[lineno]}❭'
-        rendered = f"{lineno+1:>4} ❬{doc_lines[lineno]}❭\n      {colno*' '}▲"
-        assert location.line.render(colno) == rendered
-        assert location.as_line() == rendered
-        assert location.as_line('value') == rendered
-        rendered = f"{key_lineno+1:>4} ❬{doc_lines[key_lineno]}❭\n      {key_colno*' '}▲"
-        assert location.as_line('key') == rendered
-        assert str(location.line) == doc_lines[lineno]
-        assert repr(location.line) == f'Line({lineno+1}: ❬{doc_lines[lineno]}❭)'
-        assert repr(location) == f"Location(lineno={lineno}, colno={colno}, key_lineno={key_lineno}, key_colno={key_colno})"
-
-        # check line numbers as tuples
-        assert nt.get_lines_from_keys(addresses, keys, keymap, kind='key') == (key_first_line, key_last_line), keys
-        assert nt.get_lines_from_keys(addresses, keys, keymap, kind='value') == (value_first_line, value_last_line), keys
-
-        # check line numbers as strings
-        if key_first_line+1 != key_last_line:
-            key_lines = f"{key_first_line+1}-{key_last_line}"
-        else:
-            key_lines = str(key_last_line)
-        assert nt.get_lines_from_keys(addresses, keys, keymap, kind='key', sep='-') == key_lines, keys
-        if value_first_line+1 != value_last_line:
-            value_lines = f"{value_first_line+1}-{value_last_line}"
-        else:
-            value_lines = str(value_last_line)
-        assert nt.get_lines_from_keys(addresses, keys, keymap, kind='value', sep='-') == value_lines, keys
-
     # Without key normalization
     keymap = {}
     addresses = nt.loads(
         document, keymap=keymap, on_dup=de_dup
     )
-    for case in cases:
-        given, expected = case.split('→')
-        keys = tuple(fix_key(n, True) for n in given.split())
-        check_result(keys, expected, addresses)
+    for original_keys, normalized_keys, expected in keymap_with_duplicates_cases:
+        check_keymap_result(original_keys, expected, addresses, keymap, doc_lines)
 
     # With key normalization
     keymap = {}
     addresses = nt.loads(
-        document, keymap=keymap, on_dup=de_dup, normalize_key=normalize_key
+        document, keymap=keymap, on_dup=de_dup, normalize_key=keymap_normalize_key
     )
-    for case in cases:
-        given, expected = case.split('→')
-        keys = tuple(fix_key(n, False) for n in given.split())
-        check_result(keys, expected, addresses)
+    for original_keys, normalized_keys, expected in keymap_with_duplicates_cases:
+        check_keymap_result(normalized_keys, expected, addresses, keymap, doc_lines)
 
 # test_key_utilities {{{2
-def test_key_utilities():
-    document = dedent("""
-        KEY 1:
-            key 1a: 1
-            KEY 1B: 2
-            Key-1c:
-                - a
-                - b
-        user  Names:
-            Anastacia Pickett__Cheek:
-                key 2a: 5
-                KEY-2B: 6
-        : Scores :
-            : Day One:
-            :   25 Jan 2022
-                -
-                    Sabercats : 63
-                    Rattlers: 49
-                -
-                    Predators : 42
-                    Storm: 35
-    """)
-    expected_normalized_keys = [
+key_utilities_document = dedent("""
+    KEY 1:
+        key 1a: 1
+        KEY 1B: 2
+        Key-1c:
+            - a
+            - b
+    user  Names:
+        Anastacia Pickett__Cheek:
+            key 2a: 5
+            KEY-2B: 6
+    : Scores :
+        : Day One:
+        :   25 Jan 2022
+            -
+                Sabercats : 63
+                Rattlers: 49
+            -
+                Predators : 42
+                Storm: 35
+""")
+
+# normalized keys, original keys, expected value or type of value
+key_utilities_cases = (
+    (
         ('key_1',),
-        ('key_1', 'key_1a'),
-        ('key_1', 'key_1b'),
-        ('key_1', 'key_1c'),
-        ('key_1', 'key_1c', 0),
-        ('key_1', 'key_1c', 1),
-        ('user_names',),
-        ('user_names', 'Anastacia Pickett Cheek'),
-        ('user_names', 'Anastacia Pickett Cheek', 'key_2a'),
-        ('user_names', 'Anastacia Pickett Cheek', 'key_2b'),
-        ("scores",),
-        ("scores", "day_one_25_jan_2022"),
-        ("scores", "day_one_25_jan_2022", 0),
-        ("scores", "day_one_25_jan_2022", 0, 'sabercats'),
-        ("scores", "day_one_25_jan_2022", 0, 'rattlers'),
-        ("scores", "day_one_25_jan_2022", 1),
-        ("scores", "day_one_25_jan_2022", 1, 'predators'),
-        ("scores", "day_one_25_jan_2022", 1, 'storm'),
-    ]
-    expected_original_keys = [
         ('KEY 1',),
+        dict,
+    ),
+    (
+        ('key_1', 'key_1a'),
         ('KEY 1', 'key 1a'),
+        '1',
+    ),
+    (
+        ('key_1', 'key_1b'),
         ('KEY 1', 'KEY 1B'),
+        '2',
+    ),
+    (
+        ('key_1', 'key_1c'),
         ('KEY 1', 'Key-1c'),
+        list,
+    ),
+    (
+        ('key_1', 'key_1c', 0),
         ('KEY 1', 'Key-1c', 0),
+        'a'
+    ),
+    (
+        ('key_1', 'key_1c', 1),
         ('KEY 1', 'Key-1c', 1),
+        'b'
+    ),
+    (
+        ('user_names',),
         ('user  Names',),
+        dict,
+    ),
+    (
+        ('user_names', 'Anastacia Pickett Cheek'),
         ('user  Names', 'Anastacia Pickett__Cheek'),
+        dict,
+    ),
+    (
+        ('user_names', 'Anastacia Pickett Cheek', 'key_2a'),
         ('user  Names', 'Anastacia Pickett__Cheek', 'key 2a'),
+        '5',
+    ),
+    (
+        ('user_names', 'Anastacia Pickett Cheek', 'key_2b'),
         ('user  Names', 'Anastacia Pickett__Cheek', 'KEY-2B'),
+        '6',
+    ),
+    (
+        ("scores",),
         ("Scores :",),
+        dict,
+    ),
+    (
+        ("scores", "day_one_25_jan_2022"),
         ("Scores :", "Day One:\n  25 Jan 2022"),
+        list,
+    ),
+    (
+        ("scores", "day_one_25_jan_2022", 0),
         ("Scores :", "Day One:\n  25 Jan 2022", 0),
+        dict,
+    ),
+    (
+        ("scores", "day_one_25_jan_2022", 0, 'sabercats'),
         ("Scores :", "Day One:\n  25 Jan 2022", 0, 'Sabercats'),
+        '63',
+    ),
+    (
+        ("scores", "day_one_25_jan_2022", 0, 'rattlers'),
         ("Scores :", "Day One:\n  25 Jan 2022", 0, 'Rattlers'),
+        '49',
+    ),
+    (
+        ("scores", "day_one_25_jan_2022", 1),
         ("Scores :", "Day One:\n  25 Jan 2022", 1),
+        dict,
+    ),
+    (
+        ("scores", "day_one_25_jan_2022", 1, 'predators'),
         ("Scores :", "Day One:\n  25 Jan 2022", 1, 'Predators'),
+        '42',
+    ),
+    (
+        ("scores", "day_one_25_jan_2022", 1, 'storm'),
         ("Scores :", "Day One:\n  25 Jan 2022", 1, 'Storm'),
-    ]
-    expected_values = {
-        ('key_1',): dict,
-        ('key_1', 'key_1a'): '1',
-        ('key_1', 'key_1b'): '2',
-        ('key_1', 'key_1c'): list,
-        ('key_1', 'key_1c', 0): 'a',
-        ('key_1', 'key_1c', 1): 'b',
-        ('user_names',): dict,
-        ('user_names', 'Anastacia Pickett Cheek'): dict,
-        ('user_names', 'Anastacia Pickett Cheek', 'key_2a'): '5',
-        ('user_names', 'Anastacia Pickett Cheek', 'key_2b'): '6',
-        ("scores",): dict,
-        ("scores", "day_one_25_jan_2022"): list,
-        ("scores", "day_one_25_jan_2022", 0): dict,
-        ("scores", "day_one_25_jan_2022", 0, 'sabercats'): '63',
-        ("scores", "day_one_25_jan_2022", 0, 'rattlers'): '49',
-        ("scores", "day_one_25_jan_2022", 1): dict,
-        ("scores", "day_one_25_jan_2022", 1, 'predators'): '42',
-        ("scores", "day_one_25_jan_2022", 1, 'storm'): '35',
-    }
+        '35',
+    ),
+)
 
-    unknown_norm = ('user_names', 'Anastacia Pickett Cheek', 'unknown key')
-    unknown_orig = ('user  Names', 'Anastacia Pickett__Cheek', 'unknown key')
-    unknown_index = ('scores', 3)
+key_utilities_unknown_norm = ('user_names', 'Anastacia Pickett Cheek', 'unknown key')
+key_utilities_unknown_orig = ('user  Names', 'Anastacia Pickett__Cheek', 'unknown key')
 
+def test_key_utilities():
     def normalize_key(key, parent_keys):
         if parent_keys == ('user_names',):
             return ' '.join(key.replace('_', ' ').split())
@@ -1203,22 +1202,19 @@ def test_key_utilities():
             return '_'.join(key.lower().replace('-', ' ').replace(':', ' ').split())
 
     keymap = dict()
-    data = nt.loads(document, keymap=keymap, normalize_key=normalize_key)
+    data = nt.loads(key_utilities_document, keymap=keymap, normalize_key=normalize_key)
     #print('KEYMAP:', keymap)
-    for index, normalized_keys in enumerate(expected_normalized_keys):
-        print(normalized_keys)
-
+    for normalized_keys, expected_original_keys, expected_value in key_utilities_cases:
         # check get_original_keys
         original_keys = nt.get_original_keys(normalized_keys, keymap, strict=True)
-        assert original_keys == expected_original_keys[index]
-        assert unknown_orig == nt.get_original_keys(unknown_norm, keymap, strict=False)
+        assert original_keys == expected_original_keys
+        assert key_utilities_unknown_orig == nt.get_original_keys(key_utilities_unknown_norm, keymap, strict=False)
         with pytest.raises(KeyError) as exception:
-            nt.get_original_keys(unknown_norm, keymap, strict=True)
-        assert exception.value.args[0] == unknown_norm
+            nt.get_original_keys(key_utilities_unknown_norm, keymap, strict=True)
+        assert exception.value.args[0] == key_utilities_unknown_norm
 
         # check get_value_from_keys
         value = nt.get_value_from_keys(data, normalized_keys)
-        expected_value = expected_values[normalized_keys]
         try:
             assert isinstance(value, expected_value)
         except TypeError:
@@ -1226,7 +1222,6 @@ def test_key_utilities():
 
         # check get_value
         value = nt.get_value(data, normalized_keys)
-        expected_value = expected_values[normalized_keys]
         try:
             assert isinstance(value, expected_value)
         except TypeError:
@@ -1245,32 +1240,32 @@ def test_key_utilities():
         #         assert type(value) == dict
 
         # check join_keys
-        assert join(*normalized_keys, sep=', ') == nt.join_keys(normalized_keys)
-        assert join(*normalized_keys, sep='.') == nt.join_keys(normalized_keys, sep='.')
-        assert join(*original_keys, sep=', ') == nt.join_keys(normalized_keys, keymap=keymap)
-        assert join(*unknown_norm, sep=', ') == nt.join_keys(unknown_norm)
-        assert join(*unknown_orig, sep=', ') == nt.join_keys(unknown_norm, keymap=keymap)
+        assert ', '.join(map(str, normalized_keys)) == nt.join_keys(normalized_keys)
+        assert '.'.join(map(str, normalized_keys)) == nt.join_keys(normalized_keys, sep='.')
+        assert ', '.join(map(str, original_keys)) == nt.join_keys(normalized_keys, keymap=keymap)
+        assert ', '.join(map(str, key_utilities_unknown_norm)) == nt.join_keys(key_utilities_unknown_norm)
+        assert ', '.join(map(str, key_utilities_unknown_orig)) == nt.join_keys(key_utilities_unknown_norm, keymap=keymap)
 
         # check get_keys
         assert normalized_keys == nt.get_keys(normalized_keys, keymap, original=False)
         assert original_keys == nt.get_keys(normalized_keys, keymap, original=True)
-        assert join(*normalized_keys, sep=', ') == nt.get_keys(normalized_keys, keymap, original=False, sep=", ")
-        assert join(*original_keys, sep=', ') == nt.get_keys(normalized_keys, keymap, original=True, sep=", ")
-        assert join(*unknown_norm, sep=', ') == nt.get_keys(list(unknown_norm), keymap, original=False, strict="all", sep=", ")
-        assert join(*unknown_orig, sep=', ') == nt.get_keys(unknown_norm, keymap, original=True, strict="all", sep=", ")
-        assert join(*unknown_norm, sep=', ') == nt.get_keys(unknown_norm, keymap, original=False, strict=False, sep=", ")
-        assert join(*unknown_orig, sep=', ') == nt.get_keys(list(unknown_norm), keymap, original=True, strict=False, sep=", ")
-        assert join(*unknown_norm[:-1], sep=', ') == nt.get_keys(unknown_norm, keymap, original=False, strict="found", sep=", ")
-        assert join(*unknown_orig[:-1], sep=', ') == nt.get_keys(unknown_norm, keymap, original=True, strict="found", sep=", ")
-        assert join('unknown key', sep=', ') == nt.get_keys(unknown_norm, keymap, original=False, strict="missing", sep=", ")
-        assert join('unknown key', sep=', ') == nt.get_keys(unknown_norm, keymap, original=True, strict="missing", sep=", ")
+        assert ', '.join(map(str, normalized_keys)) == nt.get_keys(normalized_keys, keymap, original=False, sep=", ")
+        assert ', '.join(map(str, original_keys)) == nt.get_keys(normalized_keys, keymap, original=True, sep=", ")
+        assert ', '.join(map(str, key_utilities_unknown_norm)) == nt.get_keys(list(key_utilities_unknown_norm), keymap, original=False, strict="all", sep=", ")
+        assert ', '.join(map(str, key_utilities_unknown_orig)) == nt.get_keys(key_utilities_unknown_norm, keymap, original=True, strict="all", sep=", ")
+        assert ', '.join(map(str, key_utilities_unknown_norm)) == nt.get_keys(key_utilities_unknown_norm, keymap, original=False, strict=False, sep=", ")
+        assert ', '.join(map(str, key_utilities_unknown_orig)) == nt.get_keys(list(key_utilities_unknown_norm), keymap, original=True, strict=False, sep=", ")
+        assert ', '.join(map(str, key_utilities_unknown_norm[:-1])) == nt.get_keys(key_utilities_unknown_norm, keymap, original=False, strict="found", sep=", ")
+        assert ', '.join(map(str, key_utilities_unknown_orig[:-1])) == nt.get_keys(key_utilities_unknown_norm, keymap, original=True, strict="found", sep=", ")
+        assert 'unknown key' == nt.get_keys(key_utilities_unknown_norm, keymap, original=False, strict="missing", sep=", ")
+        assert 'unknown key' == nt.get_keys(key_utilities_unknown_norm, keymap, original=True, strict="missing", sep=", ")
 
         with pytest.raises(KeyError) as exception:
-            nt.get_keys(unknown_norm, keymap, strict=True)
-        assert exception.value.args[0] == unknown_norm
+            nt.get_keys(key_utilities_unknown_norm, keymap, strict=True)
+        assert exception.value.args[0] == key_utilities_unknown_norm
         with pytest.raises(KeyError) as exception:
-            nt.get_keys(unknown_norm, keymap, strict="error")
-        assert exception.value.args[0] == unknown_norm
+            nt.get_keys(key_utilities_unknown_norm, keymap, strict="error")
+        assert exception.value.args[0] == key_utilities_unknown_norm
 
 # test_load_dialect {{{2
 def test_load_dialect():
@@ -1282,43 +1277,23 @@ def test_load_dialect():
     assert data == {"[7:0] data":"", "{7:0} bits":""}
 
 # test_empty {{{2
+# documents that contain no data, and the line reported for their top level
 @parametrize(
-    "top,expected", [(any,None), (dict,{}), (list,[]), (str,"")]
-)
-def test_empty_blank_lines(top, expected):
-    # just blank lines
-    document = ""
-
-    keymap = {}
-    data = nt.loads(document, top=top, keymap=keymap)
-    assert data == expected
-    assert keymap[()].as_line(offset=None) == ''
-
-# test_empty_blank_lines {{{2
-@parametrize(
-    "top,expected", [(any,None), (dict,{}), (list,[]), (str,"")]
+    "document, line", [
+        ("", ""),
+        ("\n\n\n", "   4 ❬❭"),
+        ("#comment 0\n#comment 1\n#comment 2\n# comment3", "   4 ❬# comment3❭"),
+    ],
+    ids = ["empty", "blank_lines", "comments"],
 )
-def test_empty_blank_lines(top, expected):
-    # just blank lines
-    document = "\n\n\n"
-
-    keymap = {}
-    data = nt.loads(document, top=top, keymap=keymap)
-    assert data == expected
-    assert keymap[()].as_line(offset=None) == '   4 ❬❭'
-
-# test_empty_comments {{{2
 @parametrize(
     "top,expected", [(any,None), (dict,{}), (list,[]), (str,"")]
 )
-def test_empty_comments(top, expected):
-    # just blank lines
-    document = "#comment 0\n#comment 1\n#comment 2\n# comment3"
-
+def test_empty(document, line, top, expected):
     keymap = {}
     data = nt.loads(document, top=top, keymap=keymap)
     assert data == expected
-    assert keymap[()].as_line(offset=None) == '   4 ❬# comment3❭'
+    assert keymap[()].as_line(offset=None) == line
 
 # test_empty_stdin {{{2
 @parametrize(
@@ -1362,7 +1337,7 @@ def test_empty_fd0(monkeypatch):
 @parametrize_dump_api
 @parametrize_dump_success_cases
 def test_dump_success_cases(dump, data_in, path_out, tmp_path):
-    assert dump(data_in, tmp_path, default='strict') == path_out.read_text()
+    assert dump(data_in, tmp_path, default='strict') == read_case_file(path_out)
 
 # test_dump_error_cases {{{2
 @parametrize_dump_api
@@ -1449,21 +1424,15 @@ def test_dump_default(dump, tmp_path):
         3: 'three',
     }
 
-    assert dump(data, tmp_path) == dedent('''\
-        :
-            > none
-        True: true
-        False: false
-        3: three
-    ''').lstrip()
-
-    assert dump(data, tmp_path, default=repr) == dedent('''\
+    expected = dedent('''\
         :
             > none
         True: true
         False: false
         3: three
     ''').lstrip()
+    assert dump(data, tmp_path) == expected
+    assert dump(data, tmp_path, default=repr) == expected
 
 
 # test_dump_sort_key {{{2
@@ -1509,6 +1478,10 @@ def test_dump_indent(dump, tmp_path):
 # test_dump_converters {{{2
 @parametrize_dump_api
 def test_dump_converters(dump, tmp_path):
+    # imported here as only this test needs them
+    import arrow
+    from quantiphy import Quantity
+
     x = {'int': 1, 'float': 1.0, 'str': 'A'}
 
     assert dump(x, tmp_path, default=str) == dedent('''\
@@ -1527,18 +1500,14 @@ def test_dump_converters(dump, tmp_path):
 
     y = {'info': Info(val=42)}
     converters = {Info: lambda v: f'Info(\n    val={v.val}\n)'}
-    assert dump(y, tmp_path, converters=converters) == dedent('''
-        info:
-            > Info(
-            >     val=42
-            > )
-    ''').lstrip()
-    assert dump(y, tmp_path, converters=converters, width=80) == dedent('''
+    expected = dedent('''
         info:
             > Info(
             >     val=42
             > )
     ''').lstrip()
+    assert dump(y, tmp_path, converters=converters) == expected
+    assert dump(y, tmp_path, converters=converters, width=80) == expected
 
     converters = {Info: lambda v: v.__dict__}
     result = dump(y, tmp_path, converters=converters, width=80)
@@ -2048,12 +2017,24 @@ def test_file_descriptors(tmp_path):
     writer.write_text(write_data)
     reader.write_text(read_data)
 
-    results = subprocess.run(
-        f"python {writer!s} | python {reader!s}",
-        shell = True,
-        capture_output = True,
-        env = {"COVERAGE_PROCESS_START":""},
-    )
+    # connect the programs directly rather than through a shell pipeline,
+    # which avoids starting a shell and looking up python on the path
+    env = {"COVERAGE_PROCESS_START":""}
+    with subprocess.Popen(
+        [sys.executable, str(writer)],
+        stdout = subprocess.PIPE,
+        stderr = subprocess.PIPE,
+        env = env,
+    ) as write_process:
+        results = subprocess.run(
+            [sys.executable, str(reader)],
+            stdin = write_process.stdout,
+            capture_output = True,
+            env = env,
+        )
+        write_errors = write_process.stderr.read()
+    assert write_errors == b""
+    assert write_process.returncode == 0
     assert results.stdout == b""
     assert results.stderr == b""
     assert results.returncode == 0
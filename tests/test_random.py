@@ -18,17 +18,18 @@ max_examples = 100
 def normalize_line_breaks(s):
     return s.replace('\r\n', '\n').replace('\r', '\n')
 
-non_printing_chars = set(
-    chr(n) for n in range(sys.maxunicode+1) if not chr(n).isprintable()
-)
+# str.isprintable() identifies strings that contain non-printing characters
+# without having to build a set of every such character in Unicode
 def has_invalid_chars_for_strs(s):
-    return non_printing_chars & set(s)
+    return not s.isprintable()
 
+inline_dict_chars = frozenset('{}[],:')
 def has_invalid_chars_for_dicts(s):
-    return (non_printing_chars | set('{}[],:')) & set(s)
+    return not s.isprintable() or not inline_dict_chars.isdisjoint(s)
 
+inline_list_chars = frozenset('{}[],')
 def has_invalid_chars_for_lists(s):
-    return (non_printing_chars | set('{}[],')) & set(s)
+    return not s.isprintable() or not inline_list_chars.isdisjoint(s)
 
 def pad_randomly(match):
     # pad with 0-2 spaces before and after text